@@ -1,18 +1,84 @@
-from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify
-from werkzeug.security import generate_password_hash, check_password_hash
+from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify, g, send_from_directory
+from jinja2 import FileSystemBytecodeCache
 import datetime
+import mimetypes
+import time
 from functools import wraps
 import os
 from database import db
+from auth import sessions, hash_password, verify_password, needs_rehash
+from maintenance import maintenance
+import assets
 
 app = Flask(__name__)
 app.secret_key = 'your-secret-key-change-in-production'
 
+# Cache compiled templates on disk so new processes skip Jinja compilation
+app.jinja_env.bytecode_cache = FileSystemBytecodeCache()
+
+# Fingerprinted assets never change, so browsers may cache them for a year
+ASSET_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+@app.before_request
+def start_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def add_response_headers(response):
+    """Add revalidation headers to pages and report server response time."""
+    if request.method == 'GET' and response.status_code == 200 and response.mimetype == 'text/html':
+        # Pages are per-user, so only the browser may cache them and must revalidate
+        response.headers['Cache-Control'] = 'private, no-cache'
+        response.add_etag()
+        response.make_conditional(request)
+    
+    started = g.get('request_started')
+    if started is not None:
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        response.headers['Server-Timing'] = f'app;dur={elapsed_ms:.1f}'
+        app.logger.debug(f"{request.method} {request.path} {response.status_code} in {elapsed_ms:.1f} ms")
+    return response
+
+@app.template_global()
+def asset_url(filename):
+    """URL for a static asset, fingerprinted when the asset pipeline has been run."""
+    hashed_name = assets.hashed_path(filename)
+    if hashed_name is None:
+        return url_for('static', filename=filename)
+    return url_for('built_asset', filename=hashed_name)
+
+@app.route('/assets/<path:filename>')
+def built_asset(filename):
+    """Serve a fingerprinted asset, preferring a precompressed copy."""
+    accepted = request.accept_encodings
+    for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+        if accepted[encoding] and os.path.isfile(os.path.join(assets.DIST_DIR, filename + suffix)):
+            response = send_from_directory(assets.DIST_DIR, filename + suffix,
+                                           mimetype=mimetypes.guess_type(filename)[0])
+            response.headers['Content-Encoding'] = encoding
+            break
+    else:
+        response = send_from_directory(assets.DIST_DIR, filename)
+    
+    response.headers['Cache-Control'] = ASSET_CACHE_CONTROL
+    response.vary.add('Accept-Encoding')
+    return response
+
+@app.before_request
+def ensure_database():
+    """Lazily prepare the database on the first request; a no-op afterwards."""
+    db.startup()
+    maintenance.start()
+
 # Authentication decorator
 def login_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        if 'user_id' not in session:
+        # Validated against the server-side session store, normally from memory;
+        # the cookie's user must be the one the stored session belongs to
+        stored = sessions.get(session.get('sid'))
+        if stored is None or stored['user_id'] != session.get('user_id'):
+            session.clear()
             return redirect(url_for('login'))
         return f(*args, **kwargs)
     return decorated_function
@@ -35,7 +101,7 @@ def register():
             flash('All fields are required!')
             return render_template('register.html')
         
-        password_hash = generate_password_hash(password)
+        password_hash = hash_password(password)
         
         try:
             user_id = db.execute_insert(
@@ -43,10 +109,12 @@ def register():
                 (username, email, password_hash)
             )
             
-            # Create default user preferences
+            # Create default user preferences; recorded as the new user's write
+            # so their first reads after logging in skip stale replicas
             db.execute_insert(
                 'INSERT INTO user_preferences (user_id) VALUES (?)',
-                (user_id,)
+                (user_id,),
+                user_id=user_id
             )
             
             flash('Registration successful! Please log in.')
@@ -66,12 +134,24 @@ def login():
         username = request.form['username']
         password = request.form['password']
         
+        # Authentication must never read a stale replica snapshot
         user = db.execute_single(
             'SELECT id, password_hash FROM users WHERE username = ?', 
-            (username,)
+            (username,),
+            primary=True
         )
         
-        if user and check_password_hash(user['password_hash'], password):
+        if user and verify_password(user['password_hash'], password):
+            # Transparently upgrade hashes made with an older method or cost
+            if needs_rehash(user['password_hash']):
+                db.execute_update(
+                    'UPDATE users SET password_hash = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?',
+                    (hash_password(password), user['id']),
+                    user_id=user['id']
+                )
+            
+            session.clear()
+            session['sid'] = sessions.create(user['id'])
             session['user_id'] = user['id']
             session['username'] = username
             return redirect(url_for('dashboard'))
@@ -82,6 +162,7 @@ def login():
 
 @app.route('/logout')
 def logout():
+    sessions.revoke(session.get('sid'))
     session.clear()
     return redirect(url_for('index'))
 
@@ -98,7 +179,8 @@ def dashboard():
         SUM(CASE WHEN type = 'expense' THEN amount ELSE 0 END) as total_expenses
         FROM transactions 
         WHERE user_id = ? AND strftime('%m', date) = ? AND strftime('%Y', date) = ?''',
-        (session['user_id'], f'{current_month:02d}', str(current_year)))
+        (session['user_id'], f'{current_month:02d}', str(current_year)),
+        user_id=session['user_id'])
     
     total_income = totals['total_income'] or 0
     total_expenses = totals['total_expenses'] or 0
@@ -108,7 +190,7 @@ def dashboard():
                 FROM transactions 
                 WHERE user_id = ? 
                 ORDER BY date DESC, created_at DESC 
-                LIMIT 5''', (session['user_id'],))
+                LIMIT 5''', (session['user_id'],), user_id=session['user_id'])
     
     # Category-wise expenses for current month
     expense_categories = db.execute_query('''SELECT category, SUM(amount) as total
@@ -117,7 +199,8 @@ def dashboard():
                 AND strftime('%m', date) = ? AND strftime('%Y', date) = ?
                 GROUP BY category 
                 ORDER BY SUM(amount) DESC''',
-                (session['user_id'], f'{current_month:02d}', str(current_year)))
+                (session['user_id'], f'{current_month:02d}', str(current_year)),
+                user_id=session['user_id'])
     
     return render_template('dashboard.html', 
                          total_income=total_income,
@@ -132,7 +215,8 @@ def transactions():
     all_transactions = db.execute_query('''SELECT id, type, category, amount, description, date 
                 FROM transactions 
                 WHERE user_id = ? 
-                ORDER BY date DESC, created_at DESC''', (session['user_id'],))
+                ORDER BY date DESC, created_at DESC''', (session['user_id'],),
+                user_id=session['user_id'])
     
     return render_template('transactions.html', transactions=all_transactions)
 
@@ -148,7 +232,8 @@ def add_transaction():
         
         db.execute_insert('''INSERT INTO transactions (user_id, type, category, amount, description, date)
                     VALUES (?, ?, ?, ?, ?, ?)''',
-                 (session['user_id'], transaction_type, category, amount, description, date))
+                 (session['user_id'], transaction_type, category, amount, description, date),
+                 user_id=session['user_id'])
         
         flash('Transaction added successfully!')
         return redirect(url_for('transactions'))
@@ -174,7 +259,8 @@ def budgets():
     # Get budgets for current month
     user_budgets = db.execute_query('''SELECT category, amount FROM budgets 
                 WHERE user_id = ? AND month = ? AND year = ?''',
-                (session['user_id'], current_month, current_year))
+                (session['user_id'], current_month, current_year),
+                user_id=session['user_id'])
     
     # Get actual spending for each budget category
     budget_data = []
@@ -182,7 +268,8 @@ def budgets():
         spent_result = db.execute_single('''SELECT COALESCE(SUM(amount), 0) as spent FROM transactions 
                     WHERE user_id = ? AND type = 'expense' AND category = ?
                     AND strftime('%m', date) = ? AND strftime('%Y', date) = ?''',
-                    (session['user_id'], budget['category'], f'{current_month:02d}', str(current_year)))
+                    (session['user_id'], budget['category'], f'{current_month:02d}', str(current_year)),
+                    user_id=session['user_id'])
         
         spent = spent_result['spent']
         budget_data.append({
@@ -206,7 +293,8 @@ def add_budget():
         try:
             db.execute_update('''INSERT OR REPLACE INTO budgets (user_id, category, amount, month, year)
                         VALUES (?, ?, ?, ?, ?)''',
-                     (session['user_id'], category, amount, month, year))
+                     (session['user_id'], category, amount, month, year),
+                     user_id=session['user_id'])
             flash('Budget set successfully!')
         except Exception as e:
             flash('Error setting budget!')
@@ -235,7 +323,8 @@ def chart_data():
             SUM(CASE WHEN type = 'expense' THEN amount ELSE 0 END) as expenses
             FROM transactions 
             WHERE user_id = ? AND strftime('%m', date) = ? AND strftime('%Y', date) = ?''',
-            (session['user_id'], f'{month:02d}', str(year)))
+            (session['user_id'], f'{month:02d}', str(year)),
+            user_id=session['user_id'])
         
         data.append({
             'month': date.strftime('%b %Y'),
@@ -250,7 +339,8 @@ def chart_data():
 def categories():
     """View and manage transaction categories."""
     all_categories = db.execute_query(
-        'SELECT * FROM categories ORDER BY type, name'
+        'SELECT * FROM categories ORDER BY type, name',
+        user_id=session['user_id']
     )
     return render_template('categories.html', categories=all_categories)
 
@@ -266,7 +356,8 @@ def add_category():
     try:
         db.execute_insert(
             'INSERT INTO categories (name, type, description, color) VALUES (?, ?, ?, ?)',
-            (name, category_type, description, color)
+            (name, category_type, description, color),
+            user_id=session['user_id']
         )
         flash('Category added successfully!')
     except Exception as e:
@@ -283,7 +374,8 @@ def delete_transaction(transaction_id):
     """Delete a transaction."""
     rows_affected = db.execute_update(
         'DELETE FROM transactions WHERE id = ? AND user_id = ?',
-        (transaction_id, session['user_id'])
+        (transaction_id, session['user_id']),
+        user_id=session['user_id']
     )
     
     if rows_affected > 0:
@@ -315,14 +407,11 @@ def backup():
 @login_required
 def stats():
     """View database statistics."""
-    stats = db.get_database_stats()
+    stats = db.get_database_stats(user_id=session['user_id'])
     return render_template('stats.html', stats=stats)
 
 if __name__ == '__main__':
-    # Initialize database with all tables and default data
-    db.init_database()
-    
-    # Run migrations if needed
-    db.migrate_database()
+    # Skips all schema work when the database is already current
+    db.startup()
     
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Static asset pipeline for the Personal Finance Tracker.
+Minifies CSS/JS, fingerprints filenames with a content hash and writes
+precompressed copies so they can be served with long-lived cache headers.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import re
+import sys
+from typing import Dict, Optional
+
+try:
+    import brotli  # Optional: enables .br precompression
+except ImportError:
+    brotli = None
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(BASE_DIR, 'static')
+DIST_DIR = os.path.join(STATIC_DIR, 'dist')
+MANIFEST_PATH = os.path.join(DIST_DIR, 'manifest.json')
+
+# Source files (relative to static/) processed by the pipeline
+ASSETS = ['css/style.css', 'js/main.js']
+
+_manifest: Optional[Dict[str, str]] = None
+
+def minify_css(source: str) -> str:
+    """Strip comments and redundant whitespace from a stylesheet."""
+    source = re.sub(r'/\*.*?\*/', '', source, flags=re.DOTALL)
+    source = re.sub(r'\s+', ' ', source)
+    source = re.sub(r'\s*([{};,>])\s*', r'\1', source)
+    source = source.replace(';}', '}')
+    return source.strip()
+
+def minify_js(source: str) -> str:
+    """Conservatively minify a script: drop comment-only lines and indentation.
+
+    Line breaks are kept so automatic semicolon insertion behaves exactly as
+    in the original file.
+    """
+    lines = []
+    for line in source.splitlines():
+        stripped = line.strip()
+        if not stripped or stripped.startswith('//'):
+            continue
+        lines.append(stripped)
+    return '\n'.join(lines)
+
+MINIFIERS = {
+    '.css': minify_css,
+    '.js': minify_js,
+}
+
+def build_assets() -> Dict[str, str]:
+    """Build every asset into static/dist and write the manifest.
+
+    Returns a mapping of source path to fingerprinted path, both relative
+    to their directories.
+    """
+    global _manifest
+    os.makedirs(DIST_DIR, exist_ok=True)
+
+    manifest = {}
+    for name in ASSETS:
+        with open(os.path.join(STATIC_DIR, name), encoding='utf-8') as f:
+            source = f.read()
+
+        root, ext = os.path.splitext(name)
+        content = MINIFIERS[ext](source).encode('utf-8')
+        digest = hashlib.sha256(content).hexdigest()[:12]
+        hashed_name = f"{root}.{digest}{ext}"
+
+        output_path = os.path.join(DIST_DIR, hashed_name)
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        with open(output_path, 'wb') as f:
+            f.write(content)
+        with open(output_path + '.gz', 'wb') as f:
+            f.write(gzip.compress(content, compresslevel=9, mtime=0))
+        if brotli is not None:
+            with open(output_path + '.br', 'wb') as f:
+                f.write(brotli.compress(content))
+
+        manifest[name] = hashed_name
+
+    with open(MANIFEST_PATH, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    _manifest = manifest
+    return manifest
+
+def load_manifest() -> Dict[str, str]:
+    """Load the asset manifest once; empty if the pipeline has not been run."""
+    global _manifest
+    if _manifest is None:
+        try:
+            with open(MANIFEST_PATH, encoding='utf-8') as f:
+                _manifest = json.load(f)
+        except (OSError, ValueError):
+            _manifest = {}
+    return _manifest
+
+def hashed_path(name: str) -> Optional[str]:
+    """Return the fingerprinted path for a source asset, if it has been built."""
+    return load_manifest().get(name)
+
+def main():
+    """Build assets from the command line."""
+    try:
+        manifest = build_assets()
+    except Exception as e:
+        print(f"✗ Asset build failed: {e}")
+        sys.exit(1)
+
+    for name, hashed_name in sorted(manifest.items()):
+        print(f"✓ {name} -> dist/{hashed_name}")
+    if brotli is None:
+        print("  (install 'brotli' to also write .br files)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+"""
+Authentication helpers for the Personal Finance Tracker.
+Server-side session store and password hashing with a tunable cost.
+"""
+
+import logging
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Optional, Dict, Any
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+from database import DatabaseManager, db
+
+# Werkzeug hash method, e.g. 'scrypt', 'scrypt:32768:8:1' or 'pbkdf2:sha256:600000'.
+# Unset means Werkzeug's own default, so existing hashes are not rehashed. Raising
+# the cost makes logins slower but hashes harder to brute force.
+PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD')
+
+# Limit concurrent hash computations so login bursts queue instead of
+# saturating every CPU core.
+_hash_slots = threading.BoundedSemaphore(
+    int(os.environ.get('PASSWORD_HASH_CONCURRENCY', os.cpu_count() or 1))
+)
+
+def hash_password(password: str) -> str:
+    """Hash a password with the configured method."""
+    with _hash_slots:
+        if PASSWORD_HASH_METHOD is None:
+            return generate_password_hash(password)
+        return generate_password_hash(password, method=PASSWORD_HASH_METHOD)
+
+def verify_password(password_hash: str, password: str) -> bool:
+    """Check a password against a stored hash."""
+    with _hash_slots:
+        return check_password_hash(password_hash, password)
+
+@lru_cache(maxsize=None)
+def _stored_method_prefix() -> str:
+    """The method prefix Werkzeug writes for the configured method.
+
+    Shorthands such as 'pbkdf2' or 'scrypt' are expanded with their default
+    parameters when a hash is stored, so hash a dummy value once and use its
+    prefix. Computed lazily to keep the hash cost off application startup.
+    """
+    return hash_password('').split('$', 1)[0]
+
+def needs_rehash(password_hash: str) -> bool:
+    """True if a stored hash was made with a different method or cost than configured."""
+    return password_hash.split('$', 1)[0] != _stored_method_prefix()
+
+class SessionStore:
+    """SQLite-backed login sessions with an in-memory LRU cache in front.
+
+    Cached sessions are trusted for ``revalidate_after`` seconds, so most
+    authenticated requests need no database access. Revocations made by
+    other processes take effect once their cache entry is revalidated.
+    """
+
+    def __init__(self, database: DatabaseManager, ttl: float = 86400, cache_size: int = 1024,
+                 revalidate_after: float = 60, sweep_interval: float = 300):
+        self.db = database
+        self.ttl = ttl
+        self.cache_size = cache_size
+        self.revalidate_after = revalidate_after
+        self.sweep_interval = sweep_interval
+        self.logger = logging.getLogger(__name__)
+
+        self._cache: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_sweep = 0.0
+
+    def create(self, user_id: int) -> str:
+        """Start a session for a user and return its ID."""
+        session_id = secrets.token_urlsafe(32)
+        now = time.time()
+
+        # Session lookups must always see their own writes, so they bypass
+        # read replicas and use the primary connection.
+        with self.db.get_connection() as conn:
+            conn.execute('INSERT INTO sessions (id, user_id, created_at, expires_at) VALUES (?, ?, ?, ?)',
+                         (session_id, user_id, now, now + self.ttl))
+            conn.commit()
+
+        self._remember(session_id, user_id, now + self.ttl)
+
+        if now - self._last_sweep > self.sweep_interval:
+            self.sweep_expired()
+        return session_id
+
+    def get(self, session_id: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Return the live session for an ID, or None if unknown, expired or revoked."""
+        if not session_id:
+            return None
+
+        now = time.time()
+        with self._lock:
+            entry = self._cache.get(session_id)
+            if entry is not None:
+                self._cache.move_to_end(session_id)
+
+        if entry is not None:
+            if entry['expires_at'] <= now:
+                self._forget(session_id)
+                return None
+            if now - entry['checked_at'] < self.revalidate_after:
+                return entry
+
+        with self.db.get_connection() as conn:
+            row = conn.execute('SELECT user_id, expires_at FROM sessions WHERE id = ? AND revoked = 0 AND expires_at > ?',
+                               (session_id, now)).fetchone()
+
+        if row is None:
+            self._forget(session_id)
+            return None
+        return self._remember(session_id, row['user_id'], row['expires_at'])
+
+    def revoke(self, session_id: Optional[str]):
+        """Revoke a single session."""
+        if not session_id:
+            return
+
+        with self.db.get_connection() as conn:
+            conn.execute('UPDATE sessions SET revoked = 1 WHERE id = ?', (session_id,))
+            conn.commit()
+        self._forget(session_id)
+
+    def revoke_user(self, user_id: int) -> int:
+        """Revoke every session belonging to a user and return how many were revoked."""
+        with self.db.get_connection() as conn:
+            cursor = conn.execute('UPDATE sessions SET revoked = 1 WHERE user_id = ? AND revoked = 0', (user_id,))
+            conn.commit()
+            revoked = cursor.rowcount
+
+        with self._lock:
+            for session_id in [sid for sid, entry in self._cache.items() if entry['user_id'] == user_id]:
+                del self._cache[session_id]
+        return revoked
+
+    def sweep_expired(self) -> int:
+        """Delete expired and revoked sessions and return how many were removed."""
+        now = time.time()
+        with self.db.get_connection() as conn:
+            cursor = conn.execute('DELETE FROM sessions WHERE expires_at <= ? OR revoked = 1', (now,))
+            conn.commit()
+            removed = cursor.rowcount
+
+        with self._lock:
+            for session_id in [sid for sid, entry in self._cache.items() if entry['expires_at'] <= now]:
+                del self._cache[session_id]
+            self._last_sweep = now
+
+        if removed:
+            self.logger.info(f"Swept {removed} expired or revoked sessions")
+        return removed
+
+    def _remember(self, session_id: str, user_id: int, expires_at: float) -> Dict[str, Any]:
+        """Cache a validated session, evicting the least recently used entry if full."""
+        entry = {'user_id': user_id, 'expires_at': expires_at, 'checked_at': time.time()}
+        with self._lock:
+            self._cache[session_id] = entry
+            self._cache.move_to_end(session_id)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return entry
+
+    def _forget(self, session_id: str):
+        with self._lock:
+            self._cache.pop(session_id, None)
+
+# Global session store instance
+sessions = SessionStore(db, ttl=float(os.environ.get('SESSION_TTL', '86400')))
@@ -1,15 +1,48 @@
 import sqlite3
 import os
 import logging
+import threading
+import time
 from contextlib import contextmanager
 from typing import Optional, List, Dict, Any
 
+# Bump alongside a new _migrate_to_vN method.
+SCHEMA_VERSION = 3
+
+# Replica refreshes copy this many pages per backup step and pause between
+# steps, releasing the primary's shared lock so writers can commit.
+REPLICA_BACKUP_PAGES = 256
+REPLICA_BACKUP_SLEEP = 0.005
+
 class DatabaseManager:
     """Manages SQLite database connections and operations for the finance tracker."""
     
-    def __init__(self, db_path: str = 'finance.db'):
+    def __init__(self, db_path: str = 'finance.db', replica_paths: Optional[List[str]] = None,
+                 max_staleness: float = 5.0, refresh_after_commits: int = 50):
         self.db_path = db_path
         self.setup_logging()
+        
+        # Read replicas are snapshot copies of the primary refreshed with the
+        # SQLite backup API; reads are served from them when fresh enough.
+        self.replica_paths = list(replica_paths or [])
+        self.max_staleness = max_staleness
+        self.refresh_after_commits = refresh_after_commits
+        self._replica_refreshed_at = {path: 0.0 for path in self.replica_paths}
+        self._replica_index = 0
+        self._commits_since_refresh = 0
+        self._user_last_write: Dict[Any, float] = {}
+        self._replica_lock = threading.Lock()
+        self._refresh_thread = None
+        self._refresh_timer = None
+        self._refresh_interval = None
+        
+        self._startup_lock = threading.Lock()
+        self._started = False
+        self.startup_report: Dict[str, float] = {}
+        
+        # Time of the last connection opened on behalf of the app; used by
+        # background maintenance to find idle periods.
+        self.last_activity = 0.0
     
     def setup_logging(self):
         """Setup logging for database operations."""
@@ -20,6 +53,7 @@ class DatabaseManager:
     def get_connection(self):
         """Context manager for database connections with automatic cleanup."""
         conn = None
+        self.last_activity = time.time()
         try:
             conn = sqlite3.connect(self.db_path)
             conn.row_factory = sqlite3.Row  # Enable column access by name
@@ -33,43 +67,184 @@ class DatabaseManager:
             if conn:
                 conn.close()
     
-    def execute_query(self, query: str, params: tuple = ()) -> List[sqlite3.Row]:
-        """Execute a SELECT query and return results."""
-        with self.get_connection() as conn:
+    @contextmanager
+    def get_read_connection(self, user_id: Any = None, primary: bool = False):
+        """Context manager for a read-only connection, routed to a replica when possible.
+        
+        Pass ``primary=True`` for reads that must never see a stale snapshot,
+        such as authentication lookups.
+        """
+        path = self.db_path if primary else self._choose_read_path(user_id)
+        conn = None
+        self.last_activity = time.time()
+        try:
+            if path == self.db_path:
+                conn = sqlite3.connect(self.db_path)
+            else:
+                conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+            conn.row_factory = sqlite3.Row
+            yield conn
+        except sqlite3.Error as e:
+            self.logger.error(f"Database error: {e}")
+            raise
+        finally:
+            if conn:
+                conn.close()
+    
+    def _choose_read_path(self, user_id: Any = None) -> str:
+        """Pick the database file a read should go to.
+        
+        Reads go to the primary when no replica is configured, when the next
+        replica is older than ``max_staleness`` seconds, or when ``user_id``
+        has written since that replica was refreshed (read-your-writes).
+        """
+        if not self.replica_paths:
+            return self.db_path
+        
+        with self._replica_lock:
+            path = self.replica_paths[self._replica_index % len(self.replica_paths)]
+            self._replica_index += 1
+            refreshed_at = self._replica_refreshed_at[path]
+            last_write = self._user_last_write.get(user_id, 0.0) if user_id is not None else 0.0
+        
+        if time.time() - refreshed_at > self.max_staleness:
+            self._refresh_replicas_async()
+            return self.db_path
+        if last_write >= refreshed_at:
+            return self.db_path
+        return path
+    
+    def _record_write(self, user_id: Any = None):
+        """Track a committed write for replica refresh and read-your-writes."""
+        if not self.replica_paths:
+            return
+        
+        with self._replica_lock:
+            if user_id is not None:
+                self._user_last_write[user_id] = time.time()
+            self._commits_since_refresh += 1
+            refresh_due = self._commits_since_refresh >= self.refresh_after_commits
+        
+        if refresh_due:
+            self._refresh_replicas_async()
+    
+    def refresh_replicas(self):
+        """Copy the primary into every replica file using the SQLite backup API."""
+        with self._replica_lock:
+            self._commits_since_refresh = 0
+        
+        for path in self.replica_paths:
+            started_at = time.time()
+            source = replica = None
+            try:
+                source = sqlite3.connect(self.db_path)
+                replica = sqlite3.connect(path, timeout=30)
+                source.backup(replica, pages=REPLICA_BACKUP_PAGES, sleep=REPLICA_BACKUP_SLEEP)
+            except sqlite3.Error as e:
+                self.logger.error(f"Replica refresh failed for {path}: {e}")
+                continue
+            finally:
+                if replica:
+                    replica.close()
+                if source:
+                    source.close()
+            
+            # Stamp with the start time so writes racing the copy are treated
+            # as not yet replicated.
+            with self._replica_lock:
+                self._replica_refreshed_at[path] = started_at
+        
+        # Users whose last write predates every replica can read from any of
+        # them, so their entries no longer affect routing.
+        with self._replica_lock:
+            oldest_refresh = min(self._replica_refreshed_at.values(), default=0.0)
+            self._user_last_write = {
+                user_id: written_at for user_id, written_at in self._user_last_write.items()
+                if written_at >= oldest_refresh
+            }
+    
+    def _refresh_replicas_async(self):
+        """Refresh replicas in a background thread unless a refresh is already running."""
+        with self._replica_lock:
+            if self._refresh_thread is not None and self._refresh_thread.is_alive():
+                return
+            self._refresh_thread = threading.Thread(target=self.refresh_replicas, daemon=True)
+            self._refresh_thread.start()
+    
+    def start_replica_refresh(self, interval: float):
+        """Refresh replicas every ``interval`` seconds on a background timer."""
+        self._refresh_interval = interval
+        self._schedule_replica_refresh()
+    
+    def stop_replica_refresh(self):
+        """Stop the scheduled replica refresh, if running."""
+        self._refresh_interval = None
+        if self._refresh_timer is not None:
+            self._refresh_timer.cancel()
+            self._refresh_timer = None
+    
+    def _schedule_replica_refresh(self):
+        """Arm the timer for the next scheduled replica refresh."""
+        if self._refresh_interval is None:
+            return
+        
+        def run():
+            self._refresh_replicas_async()
+            self._schedule_replica_refresh()
+        
+        self._refresh_timer = threading.Timer(self._refresh_interval, run)
+        self._refresh_timer.daemon = True
+        self._refresh_timer.start()
+    
+    def execute_query(self, query: str, params: tuple = (), user_id: Any = None,
+                      primary: bool = False) -> List[sqlite3.Row]:
+        """Execute a SELECT query and return results, reading from a replica when fresh."""
+        with self.get_read_connection(user_id, primary) as conn:
             cursor = conn.cursor()
             cursor.execute(query, params)
             return cursor.fetchall()
     
-    def execute_single(self, query: str, params: tuple = ()) -> Optional[sqlite3.Row]:
-        """Execute a SELECT query and return a single result."""
-        with self.get_connection() as conn:
+    def execute_single(self, query: str, params: tuple = (), user_id: Any = None,
+                       primary: bool = False) -> Optional[sqlite3.Row]:
+        """Execute a SELECT query and return a single result, reading from a replica when fresh."""
+        with self.get_read_connection(user_id, primary) as conn:
             cursor = conn.cursor()
             cursor.execute(query, params)
             return cursor.fetchone()
     
-    def execute_update(self, query: str, params: tuple = ()) -> int:
+    def execute_update(self, query: str, params: tuple = (), user_id: Any = None) -> int:
         """Execute an INSERT, UPDATE, or DELETE query and return affected rows."""
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(query, params)
             conn.commit()
+            self._record_write(user_id)
             return cursor.rowcount
     
-    def execute_insert(self, query: str, params: tuple = ()) -> int:
+    def execute_insert(self, query: str, params: tuple = (), user_id: Any = None) -> int:
         """Execute an INSERT query and return the new row ID."""
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(query, params)
             conn.commit()
+            self._record_write(user_id)
             return cursor.lastrowid
     
-    def init_database(self):
-        """Initialize the database with all required tables and indexes."""
+    def init_database(self, seed: bool = True):
+        """Initialize the database with all required tables and indexes.
+        
+        Pass ``seed=False`` to skip inserting the default categories, e.g. when
+        seeding is deferred to a background task.
+        """
         self.logger.info("Initializing database...")
         
         with self.get_connection() as conn:
             cursor = conn.cursor()
             
+            # Only takes effect on a new, empty database; existing files are
+            # converted with `python db_utils.py maintain --enable-auto-vacuum`.
+            cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+            
             # Users table
             cursor.execute('''CREATE TABLE IF NOT EXISTS users (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -130,15 +305,44 @@ class DatabaseManager:
                 FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
             )''')
             
+            # Server-side login sessions
+            self._create_sessions_table(cursor)
+            
+            # Last run of each background maintenance task
+            self._create_maintenance_table(cursor)
+            
             # Create indexes for better performance
             self._create_indexes(cursor)
             
             # Insert default categories
-            self._insert_default_categories(cursor)
+            if seed:
+                self._insert_default_categories(cursor)
             
             conn.commit()
             self.logger.info("Database initialization completed successfully")
     
+    def _create_sessions_table(self, cursor):
+        """Create the server-side sessions table used by auth.SessionStore."""
+        cursor.execute('''CREATE TABLE IF NOT EXISTS sessions (
+            id TEXT PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            expires_at REAL NOT NULL,
+            revoked INTEGER NOT NULL DEFAULT 0,
+            FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
+        )''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_sessions_user_id ON sessions(user_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_sessions_expires_at ON sessions(expires_at)")
+    
+    def _create_maintenance_table(self, cursor):
+        """Create the table recording when each maintenance task last ran."""
+        cursor.execute('''CREATE TABLE IF NOT EXISTS maintenance_runs (
+            task TEXT PRIMARY KEY,
+            last_run REAL NOT NULL,
+            duration_ms REAL,
+            result TEXT
+        )''')
+    
     def _create_indexes(self, cursor):
         """Create database indexes for better query performance."""
         indexes = [
@@ -198,9 +402,9 @@ class DatabaseManager:
             self.logger.error(f"Backup failed: {e}")
             raise
     
-    def get_database_stats(self) -> Dict[str, Any]:
+    def get_database_stats(self, user_id: Any = None) -> Dict[str, Any]:
         """Get database statistics."""
-        with self.get_connection() as conn:
+        with self.get_read_connection(user_id) as conn:
             cursor = conn.cursor()
             
             stats = {}
@@ -218,6 +422,71 @@ class DatabaseManager:
             
             return stats
     
+    def startup(self) -> Dict[str, float]:
+        """Prepare the database for serving requests as cheaply as possible.
+        
+        Reads ``schema_version`` once and skips all DDL when the schema is
+        current. Otherwise runs ``init_database()`` and ``migrate_database()``.
+        Category seeding and ``PRAGMA optimize`` run in a background thread.
+        Safe to call repeatedly; only the first call does any work. Returns
+        the per-phase timings in milliseconds.
+        """
+        with self._startup_lock:
+            if self._started:
+                return self.startup_report
+            
+            report = {}
+            started_at = time.perf_counter()
+            
+            phase_at = time.perf_counter()
+            current_version = self._read_schema_version()
+            report['version_check_ms'] = (time.perf_counter() - phase_at) * 1000
+            
+            needs_schema = current_version < SCHEMA_VERSION
+            if needs_schema:
+                phase_at = time.perf_counter()
+                self.init_database(seed=False)
+                self.migrate_database()
+                report['schema_ms'] = (time.perf_counter() - phase_at) * 1000
+            
+            threading.Thread(target=self._deferred_startup, args=(needs_schema,), daemon=True).start()
+            
+            report['total_ms'] = (time.perf_counter() - started_at) * 1000
+            self.startup_report = report
+            self._started = True
+            
+            timings = ', '.join(f"{name}={value:.1f}" for name, value in report.items())
+            self.logger.info(f"Database ready (schema v{max(current_version, SCHEMA_VERSION)}): {timings}")
+            return report
+    
+    def _read_schema_version(self) -> int:
+        """Read the schema version without running any DDL; 0 if untracked."""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            row = conn.execute('SELECT MAX(version) FROM schema_version').fetchone()
+            return (row[0] or 0) if row else 0
+        except sqlite3.OperationalError:
+            return 0  # No schema_version table yet
+        finally:
+            conn.close()
+    
+    def _deferred_startup(self, seed: bool):
+        """Non-critical startup work: seed default categories and refresh planner stats."""
+        started_at = time.perf_counter()
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                if seed:
+                    self._insert_default_categories(cursor)
+                    conn.commit()
+                cursor.execute('PRAGMA optimize')
+        except sqlite3.Error as e:
+            self.logger.error(f"Deferred startup work failed: {e}")
+            return
+        
+        self.startup_report['deferred_ms'] = (time.perf_counter() - started_at) * 1000
+        self.logger.info(f"Deferred startup work finished in {self.startup_report['deferred_ms']:.1f} ms")
+    
     def migrate_database(self):
         """Handle database migrations for schema updates."""
         current_version = self._get_schema_version()
@@ -225,6 +494,12 @@ class DatabaseManager:
         if current_version < 1:
             self._migrate_to_v1()
         
+        if current_version < 2:
+            self._migrate_to_v2()
+        
+        if current_version < 3:
+            self._migrate_to_v3()
+        
         # Add more migrations as needed
     
     def _get_schema_version(self) -> int:
@@ -266,6 +541,27 @@ class DatabaseManager:
             # Set schema version
             cursor.execute('INSERT OR REPLACE INTO schema_version (version) VALUES (1)')
             conn.commit()
+    
+    def _migrate_to_v2(self):
+        """Migration to version 2 - adds the server-side sessions table."""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            self._create_sessions_table(cursor)
+            cursor.execute('INSERT OR REPLACE INTO schema_version (version) VALUES (2)')
+            conn.commit()
+    
+    def _migrate_to_v3(self):
+        """Migration to version 3 - adds the maintenance_runs table."""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            self._create_maintenance_table(cursor)
+            cursor.execute('INSERT OR REPLACE INTO schema_version (version) VALUES (3)')
+            conn.commit()
 
-# Global database manager instance
-db = DatabaseManager()
\ No newline at end of file
+# Global database manager instance; read replicas are opt-in through
+# FINANCE_DB_REPLICAS (comma-separated file paths).
+db = DatabaseManager(
+    replica_paths=[p for p in os.environ.get('FINANCE_DB_REPLICAS', '').split(',') if p],
+    max_staleness=float(os.environ.get('FINANCE_DB_REPLICA_STALENESS', '5')),
+    refresh_after_commits=int(os.environ.get('FINANCE_DB_REPLICA_REFRESH_COMMITS', '50'))
+)
@@ -8,7 +8,8 @@ import argparse
 import os
 import sys
 import datetime
-from database import db
+from database import db, SCHEMA_VERSION
+from maintenance import maintenance
 
 def init_database():
     """Initialize the database with all tables and default data."""
@@ -99,7 +100,7 @@ def check_database():
                 return False
         
         # Check if all required tables exist
-        tables = ['users', 'transactions', 'budgets', 'categories', 'user_preferences']
+        tables = ['users', 'transactions', 'budgets', 'categories', 'user_preferences', 'sessions', 'maintenance_runs']
         with db.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
@@ -118,6 +119,51 @@ def check_database():
         return False
     return True
 
+def maintain_database(force=False, max_pages=None, enable_auto_vacuum=False):
+    """Run due maintenance tasks: incremental vacuum, optimize, analyze and quick_check."""
+    print("Running database maintenance...")
+    try:
+        # Maintenance records its runs in maintenance_runs (schema v3). Read the
+        # version without DDL so a new database still gets auto_vacuum=INCREMENTAL.
+        if db._read_schema_version() < SCHEMA_VERSION:
+            print("Applying pending schema migrations...")
+            db.init_database()
+            db.migrate_database()
+            print("✓ Schema is up to date")
+        
+        if enable_auto_vacuum:
+            print("Converting to auto_vacuum=INCREMENTAL (rewrites the database file)...")
+            if maintenance.enable_incremental_vacuum():
+                print("✓ Incremental auto-vacuum enabled")
+            else:
+                print("✓ Incremental auto-vacuum already enabled")
+        elif maintenance.auto_vacuum_mode() != 'incremental':
+            print("  Note: auto_vacuum is not INCREMENTAL; run with --enable-auto-vacuum to reclaim free space")
+        
+        results = maintenance.run_due_tasks(force=force, max_vacuum_pages=max_pages)
+        if not results:
+            print("✓ No maintenance tasks are due (use --force to run them anyway)")
+        
+        success = True
+        for task, result in results.items():
+            if isinstance(result, Exception):
+                print(f"✗ {task}: {result}")
+                success = False
+            elif task == 'incremental_vacuum':
+                print(f"✓ {task}: freed {result} pages")
+            elif task == 'quick_check':
+                if result:
+                    print(f"✗ {task}: {'; '.join(result)}")
+                    success = False
+                else:
+                    print(f"✓ {task}: OK")
+            else:
+                print(f"✓ {task}: done")
+    except Exception as e:
+        print(f"✗ Database maintenance failed: {e}")
+        return False
+    return success
+
 def reset_database():
     """Reset database (WARNING: This will delete all data!)."""
     print("⚠️  WARNING: This will delete ALL data in the database!")
@@ -145,9 +191,13 @@ def main():
     """Main command-line interface."""
     parser = argparse.ArgumentParser(description='Database utilities for Personal Finance Tracker')
     parser.add_argument('command', choices=[
-        'init', 'backup', 'migrate', 'stats', 'check', 'reset'
+        'init', 'backup', 'migrate', 'stats', 'check', 'maintain', 'reset'
     ], help='Command to execute')
     parser.add_argument('--backup-path', type=str, help='Path for database backup')
+    parser.add_argument('--force', action='store_true', help='Run all maintenance tasks even if not due')
+    parser.add_argument('--max-pages', type=int, help='Maximum pages to free with incremental vacuum')
+    parser.add_argument('--enable-auto-vacuum', action='store_true',
+                        help='Convert the database to auto_vacuum=INCREMENTAL (one-off full VACUUM)')
     
     args = parser.parse_args()
     
@@ -164,6 +214,8 @@ def main():
         success = show_stats()
     elif args.command == 'check':
         success = check_database()
+    elif args.command == 'maintain':
+        success = maintain_database(args.force, args.max_pages, args.enable_auto_vacuum)
     elif args.command == 'reset':
         success = reset_database()
     
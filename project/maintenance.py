@@ -0,0 +1,241 @@
+"""
+Online database maintenance for the Personal Finance Tracker.
+Reclaims free pages, refreshes planner statistics and checks integrity in
+small, throttled steps so the app never has to be taken offline.
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+from typing import Dict, Any, List, Optional
+
+from database import DatabaseManager, db
+
+# Minimum seconds between runs of each task
+TASK_INTERVALS = {
+    'incremental_vacuum': 3600,
+    'optimize': 6 * 3600,
+    'analyze': 7 * 24 * 3600,
+    'quick_check': 24 * 3600,
+}
+
+class DatabaseMaintenance:
+    """Runs SQLite maintenance tasks, each throttled by its last recorded run."""
+
+    def __init__(self, database: DatabaseManager, vacuum_step_pages: int = 64,
+                 vacuum_step_pause: float = 0.05, idle_after: float = 30):
+        self.db = database
+        self.vacuum_step_pages = vacuum_step_pages
+        self.vacuum_step_pause = vacuum_step_pause
+        self.idle_after = idle_after
+        self.logger = logging.getLogger(__name__)
+
+        self._run_lock = threading.Lock()
+        self._schedule_lock = threading.Lock()
+        self._timer = None
+        self._interval = None
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open an autocommit connection that does not count as app activity."""
+        conn = sqlite3.connect(self.db.db_path, isolation_level=None, timeout=5)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def is_idle(self) -> bool:
+        """True if the app has not touched the database for ``idle_after`` seconds."""
+        return time.time() - self.db.last_activity >= self.idle_after
+
+    def auto_vacuum_mode(self) -> str:
+        """Return the current auto_vacuum mode: 'none', 'full' or 'incremental'."""
+        conn = self._connect()
+        try:
+            mode = conn.execute('PRAGMA auto_vacuum').fetchone()[0]
+        finally:
+            conn.close()
+        return {0: 'none', 1: 'full', 2: 'incremental'}.get(mode, str(mode))
+
+    def enable_incremental_vacuum(self) -> bool:
+        """Switch the database to auto_vacuum=INCREMENTAL.
+
+        Existing databases need a one-off VACUUM for the setting to take
+        effect, which rewrites the whole file and blocks writers while it
+        runs. Returns True if a conversion was performed.
+        """
+        if self.auto_vacuum_mode() == 'incremental':
+            return False
+
+        conn = self._connect()
+        try:
+            conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+            conn.execute('VACUUM')
+        finally:
+            conn.close()
+        self.logger.info("Database converted to auto_vacuum=INCREMENTAL")
+        return True
+
+    def incremental_vacuum(self, max_pages: Optional[int] = None, stop_when_busy: bool = True) -> int:
+        """Release free pages to the filesystem in small steps.
+
+        Pauses between steps and, when ``stop_when_busy`` is set, stops as
+        soon as the app touches the database. Returns the number of pages freed.
+        """
+        if self.auto_vacuum_mode() != 'incremental':
+            return 0
+
+        started_at = time.time()
+        freed = 0
+        conn = self._connect()
+        try:
+            while max_pages is None or freed < max_pages:
+                free_pages = conn.execute('PRAGMA freelist_count').fetchone()[0]
+                if free_pages == 0:
+                    break
+                if stop_when_busy and self.db.last_activity > started_at:
+                    break
+
+                step = min(self.vacuum_step_pages, free_pages)
+                if max_pages is not None:
+                    step = min(step, max_pages - freed)
+                # executescript steps the pragma to completion; execute() would
+                # free only a single page per call.
+                conn.executescript(f'PRAGMA incremental_vacuum({step})')
+                step_freed = free_pages - conn.execute('PRAGMA freelist_count').fetchone()[0]
+                if step_freed <= 0:
+                    break
+                freed += step_freed
+                time.sleep(self.vacuum_step_pause)
+        finally:
+            conn.close()
+        return freed
+
+    def optimize(self):
+        """Let SQLite refresh statistics it considers stale, with a bounded analysis cost."""
+        conn = self._connect()
+        try:
+            conn.execute('PRAGMA analysis_limit = 400')
+            conn.execute('PRAGMA optimize')
+        finally:
+            conn.close()
+
+    def analyze(self):
+        """Rebuild planner statistics for every table and index."""
+        conn = self._connect()
+        try:
+            conn.execute('ANALYZE')
+        finally:
+            conn.close()
+
+    def quick_check(self) -> List[str]:
+        """Run PRAGMA quick_check and return the problems found (empty if OK)."""
+        conn = self._connect()
+        try:
+            rows = [row[0] for row in conn.execute('PRAGMA quick_check').fetchall()]
+        finally:
+            conn.close()
+        if rows == ['ok']:
+            return []
+        self.logger.error(f"Database quick_check reported problems: {rows}")
+        return rows
+
+    def last_runs(self) -> Dict[str, float]:
+        """Return the last run time (epoch seconds) of each task."""
+        conn = self._connect()
+        try:
+            rows = conn.execute('SELECT task, last_run FROM maintenance_runs').fetchall()
+        except sqlite3.OperationalError:
+            return {}  # Table not created yet; run migrations
+        finally:
+            conn.close()
+        return {row['task']: row['last_run'] for row in rows}
+
+    def _record_run(self, task: str, duration_ms: float, result: str):
+        conn = self._connect()
+        try:
+            conn.execute('INSERT OR REPLACE INTO maintenance_runs (task, last_run, duration_ms, result) VALUES (?, ?, ?, ?)',
+                         (task, time.time(), duration_ms, result))
+        except sqlite3.OperationalError as e:
+            # Without the table the task still ran; it just won't be throttled
+            self.logger.warning(f"Could not record maintenance run for {task} ({e}); run migrations")
+        finally:
+            conn.close()
+
+    def run_due_tasks(self, force: bool = False, max_vacuum_pages: Optional[int] = None,
+                      require_idle: bool = False) -> Dict[str, Any]:
+        """Run every task whose interval has elapsed, or all of them with ``force``.
+
+        Returns a mapping of task name to its result; tasks that were not due
+        are omitted. With ``require_idle`` nothing runs while the app is busy.
+        """
+        results = {}
+        if require_idle and not self.is_idle():
+            return results
+        if not self._run_lock.acquire(blocking=False):
+            return results  # Another run is in progress
+
+        try:
+            last_runs = self.last_runs()
+            now = time.time()
+            tasks = {
+                'incremental_vacuum': lambda: self.incremental_vacuum(max_vacuum_pages, stop_when_busy=require_idle),
+                'optimize': self.optimize,
+                'analyze': self.analyze,
+                'quick_check': self.quick_check,
+            }
+
+            for task, run in tasks.items():
+                if not force and now - last_runs.get(task, 0) < TASK_INTERVALS[task]:
+                    continue
+
+                started_at = time.perf_counter()
+                try:
+                    result = run()
+                except sqlite3.Error as e:
+                    self.logger.error(f"Maintenance task {task} failed: {e}")
+                    results[task] = e
+                    continue
+                duration_ms = (time.perf_counter() - started_at) * 1000
+
+                self._record_run(task, duration_ms, repr(result))
+                results[task] = result
+                self.logger.info(f"Maintenance task {task} finished in {duration_ms:.1f} ms")
+        finally:
+            self._run_lock.release()
+        return results
+
+    def start(self, interval: float = 60):
+        """Check for due tasks every ``interval`` seconds, running them only while idle."""
+        # Called on every request, so concurrent first requests must not each
+        # start their own timer chain.
+        with self._schedule_lock:
+            if self._interval is not None:
+                return
+            self._interval = interval
+            self._arm_timer()
+
+    def stop(self):
+        """Stop the background scheduler, if running."""
+        with self._schedule_lock:
+            self._interval = None
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+    def _arm_timer(self):
+        """Arm the timer for the next scheduled check; caller holds _schedule_lock."""
+        if self._interval is None:
+            return
+
+        def run():
+            try:
+                self.run_due_tasks(require_idle=True)
+            finally:
+                with self._schedule_lock:
+                    self._arm_timer()
+
+        self._timer = threading.Timer(self._interval, run)
+        self._timer.daemon = True
+        self._timer.start()
+
+# Global maintenance instance
+maintenance = DatabaseMaintenance(db)
@@ -29,6 +29,10 @@ else
 fi
 
 echo "✅ Dependencies installed successfully!"
+
+# Minify and fingerprint static assets
+echo "🎨 Building static assets..."
+python assets.py
 echo "🌐 Starting Flask application..."
 echo "📱 Open your browser and go to: http://localhost:5000"
 echo "🛑 Press Ctrl+C to stop the server"